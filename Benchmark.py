@@ -0,0 +1,163 @@
+###########################################################################################################################
+####################################################     LIBRARIES     ####################################################
+###########################################################################################################################
+
+# Set the cwd to the one of the file
+import os
+if __name__ == '__main__':
+    try: os.chdir(os.path.dirname(__file__))
+    except: pass
+
+import json
+import argparse
+from time import perf_counter
+
+import sys
+folders = ['./', '../', '../Modules']
+for folder in folders: sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), folder)))
+
+# get_pyqt_image needs a real QApplication, mock Qt modules to make them optional when PyQt is not installed
+try: from PyQt5.QtWidgets import QApplication
+except ImportError:
+    from unittest.mock import MagicMock
+    sys.modules['PyQt5'] = MagicMock()
+    sys.modules['PyQt5.QtGui'] = MagicMock()
+    QApplication = None
+
+from Image_Processing import Image_Processing
+import Control_System
+from Profiler import percentile
+
+###########################################################################################################################
+#################################################     INITIALIZATIONS     #################################################
+###########################################################################################################################
+
+IMAGE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), 'Media/Images'))
+TESTS_DATA_FILE = os.path.abspath(os.path.join(os.path.dirname(__file__), 'Tests Data/Image_Processing_Data.json'))
+BASELINE_FILE = os.path.abspath(os.path.join(os.path.dirname(__file__), 'Tests Data/Benchmark_Baseline.json'))
+
+# Time available to process a frame when capturing at 60 FPS (ms)
+FRAME_BUDGET = 1000 / 60
+# Construction decodes a PNG from disk, which never happens in the capture loop, so it has no frame budget
+FRAME_BUDGETS = {'Image_Processing': None}
+# Allowed slowdown of the p95 latency with respect to the stored baseline
+BASELINE_TOLERANCE = 1.25
+PERCENTILES = [50, 95, 99]
+
+DETECTORS = [name for name in dir(Control_System) if name.startswith('is_') and name.endswith('_visible')]
+
+###########################################################################################################################
+###########################################################################################################################
+
+def measure(function, repetitions):
+
+    """
+    Calls a function several times and returns its latencies in milliseconds.
+    """
+
+    latencies = []
+    for _ in range(repetitions):
+        start_time = perf_counter()
+        function()
+        latencies.append(1000 * (perf_counter() - start_time))
+    return latencies
+
+###########################################################################################################################
+###########################################################################################################################
+
+def run_benchmarks(repetitions):
+
+    """
+    Times Image_Processing and every Control_System detector over all the images in Media/Images.
+
+    Args:
+        repetitions (int): Number of timed calls per function and image.
+
+    Returns:
+        dict: {'function @ resolution': [latencies in ms]}, e.g. 'resize_image @ 720p', aggregated over the images of
+            each resolution so a regression at one resolution is not hidden by the other.
+    """
+
+    with open(TESTS_DATA_FILE, 'r') as file:
+        images_with_name = {item['image_path'] for item in json.load(file) if item['has_pokemon_name']}
+
+    # Skip get_pyqt_image when PyQt is not installed
+    app = QApplication and (QApplication.instance() or QApplication(sys.argv))
+
+    results = {}
+    for image_name in sorted(os.listdir(IMAGE_DIR)):
+        if not image_name.endswith('.png'): continue
+        image_path = os.path.join(IMAGE_DIR, image_name)
+
+        timings = {'Image_Processing': measure(lambda: Image_Processing(image_path), repetitions)}
+        image = Image_Processing(image_path)
+        resolution = f'{image.original_image.shape[0]}p'
+        timings['resize_image'] = measure(image.resize_image, repetitions)
+        if image_name in images_with_name: timings['recognize_pokemon'] = measure(image.recognize_pokemon, repetitions)
+        if app: timings['get_pyqt_image'] = measure(lambda: image.get_pyqt_image(image.resized_image), repetitions)
+        for detector in DETECTORS:
+            timings[detector] = measure(lambda: getattr(Control_System, detector)(image), repetitions)
+
+        for function, latencies in timings.items(): results.setdefault(f'{function} @ {resolution}', []).extend(latencies)
+
+    return results
+
+###########################################################################################################################
+###########################################################################################################################
+
+def check_regressions(summary, baseline):
+
+    """
+    Compares the measured percentiles with the frame budget and the stored baseline.
+
+    Args:
+        summary (dict): {'function @ resolution': {'p50': ms, 'p95': ms, 'p99': ms}}
+        baseline (dict): Summary of a previous run with the same format.
+
+    Returns:
+        list: Description of every regression found.
+    """
+
+    regressions = []
+    for function, stats in summary.items():
+        budget = FRAME_BUDGETS.get(function.split(' @ ')[0], FRAME_BUDGET)
+        if budget is not None and stats['p95'] > budget:
+            regressions.append(f'{function}: p95 {stats["p95"]:.2f} ms exceeds the frame budget of {budget:.2f} ms')
+        if function in baseline and stats['p95'] > baseline[function]['p95'] * BASELINE_TOLERANCE:
+            regressions.append(
+                f'{function}: p95 {stats["p95"]:.2f} ms is slower than the baseline {baseline[function]["p95"]:.2f} ms'
+            )
+    return regressions
+
+###########################################################################################################################
+#####################################################     PROGRAM     #####################################################
+###########################################################################################################################
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Per-function latency benchmarks over Media/Images')
+    parser.add_argument('--repetitions', type = int, default = 20, help = 'Timed calls per function and image')
+    parser.add_argument('--update-baseline', action = 'store_true', help = 'Store this run as the new baseline')
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.repetitions)
+    summary = {
+        function: {f'p{percent}': percentile(latencies, percent) for percent in PERCENTILES}
+        for function, latencies in results.items()
+    }
+
+    print(f'{"Function @ resolution":<50}' + ''.join(f'{"p" + str(percent) + " (ms)":>12}' for percent in PERCENTILES))
+    for function, stats in summary.items():
+        print(f'{function:<50}' + ''.join(f'{stats["p" + str(percent)]:>12.2f}' for percent in PERCENTILES))
+
+    if args.update_baseline:
+        with open(BASELINE_FILE, 'w') as file: json.dump(summary, file, indent = 4)
+        print(f'\nBaseline stored in {BASELINE_FILE}')
+        sys.exit(0)
+
+    baseline = {}
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE, 'r') as file: baseline = json.load(file)
+
+    regressions = check_regressions(summary, baseline)
+    for regression in regressions: print(f'REGRESSION - {regression}')
+    sys.exit(1 if regressions else 0)
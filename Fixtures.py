@@ -0,0 +1,110 @@
+###########################################################################################################################
+####################################################     LIBRARIES     ####################################################
+###########################################################################################################################
+
+import os
+import cv2
+import hashlib
+import numpy as np
+
+###########################################################################################################################
+#################################################     INITIALIZATIONS     #################################################
+###########################################################################################################################
+
+IMAGE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), 'Media/Images'))
+CACHE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), 'Media/Cache'))
+
+# Decoded frames shared by every test of the session
+_frames = {}
+
+###########################################################################################################################
+###########################################################################################################################
+
+def get_image_hash(image_path):
+
+    """
+    Computes the content hash of an image file. The cache is keyed by content, so replacing a fixture invalidates its
+    decoded frame even if the file name stays the same.
+
+    Args:
+        image_path (str): Path to the image file.
+
+    Returns:
+        str: SHA-256 hex digest of the file content.
+    """
+
+    with open(image_path, 'rb') as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+###########################################################################################################################
+###########################################################################################################################
+
+def load_frame(image_path):
+
+    """
+    Returns the decoded BGR frame of an image, decoding the PNG at most once. The raw array is stored as a .npy file in
+    CACHE_DIR and memory-mapped read-only, so later sessions (and other processes) skip the decoding completely.
+
+    Args:
+        image_path (str): Path to the image file.
+
+    Returns:
+        numpy.ndarray: Read-only view of the decoded frame.
+    """
+
+    image_path = os.path.abspath(image_path)
+    if image_path in _frames: return _frames[image_path]
+
+    cache_path = os.path.join(CACHE_DIR, f'{get_image_hash(image_path)}.npy')
+    if not os.path.exists(cache_path):
+        frame = cv2.imread(image_path)
+        if frame is None: raise FileNotFoundError(f'Could not decode image: {image_path}')
+
+        # Write to a temporary file first so concurrent sessions never read a half-written cache entry
+        os.makedirs(CACHE_DIR, exist_ok = True)
+        temporary_path = f'{cache_path}.{os.getpid()}.tmp'
+        with open(temporary_path, 'wb') as file: np.save(file, frame)
+        os.replace(temporary_path, cache_path)
+
+    _frames[image_path] = np.load(cache_path, mmap_mode = 'r')
+    return _frames[image_path]
+
+###########################################################################################################################
+###########################################################################################################################
+
+def get_image(image_class, image_path):
+
+    """
+    Returns a fresh Image_Processing object for a fixture image without decoding the PNG again. The object is built from
+    a private copy of the cached frame, the same way the capture loop builds it from a captured frame, so nothing is
+    shared between tests and Image_Processing is free to modify its image in place.
+
+    Args:
+        image_class (type): Image_Processing class to instantiate.
+        image_path (str): Path to the image file.
+
+    Returns:
+        Image_Processing: Object built from the decoded frame.
+    """
+
+    return image_class(load_frame(image_path).copy())
+
+###########################################################################################################################
+###########################################################################################################################
+
+def advance_time(control_system, seconds, elapsed_time = 0):
+
+    """
+    Simulates that time has elapsed for the state machines, through the virtual clock when Control_System provides one
+    and by shifting the start time of the current state (state_timer) otherwise.
+
+    Args:
+        control_system (module): Control_System module.
+        seconds (float): Elapsed time to simulate.
+        elapsed_time (float): Real time that already elapsed during those seconds. state_timer is compared with the wall
+            clock, so only the difference is simulated and the state machines see exactly the requested time.
+    """
+
+    clock = getattr(control_system, 'clock', None)
+    if hasattr(clock, 'advance'): clock.advance(seconds)
+    else: control_system.state_timer -= seconds - elapsed_time
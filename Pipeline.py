@@ -0,0 +1,286 @@
+###########################################################################################################################
+####################################################     LIBRARIES     ####################################################
+###########################################################################################################################
+
+# Set the cwd to the one of the file
+import os
+if __name__ == '__main__':
+    try: os.chdir(os.path.dirname(__file__))
+    except: pass
+
+import argparse
+import threading
+from collections import deque
+from time import perf_counter, sleep
+
+import sys
+folders = ['./', '../', '../Modules']
+for folder in folders: sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), folder)))
+
+import Fixtures
+import Replay
+
+###########################################################################################################################
+#################################################     INITIALIZATIONS     #################################################
+###########################################################################################################################
+
+# Frames waiting between two stages. Small queues keep the decisions close to the live video
+QUEUE_SIZE = 2
+PREPROCESS_WORKERS = 2
+
+###########################################################################################################################
+###########################################################################################################################
+
+class Drop_Oldest_Queue:
+
+    """
+    Bounded queue shared by two pipeline stages. When it is full, the oldest frame is discarded to make room for the new
+    one, so a slow stage always works on the most recent frames instead of falling behind the video. A blocking queue
+    makes the producer wait for room instead, for sources without a live deadline.
+    """
+
+    def __init__(self, size, blocking = False):
+        self.items = deque(maxlen = size)
+        self.condition = threading.Condition()
+        self.blocking = blocking
+        self.closed = False
+        self.dropped = 0
+
+    #######################################################################################################################
+
+    def put(self, item):
+        with self.condition:
+            while self.blocking and len(self.items) == self.items.maxlen and not self.closed: self.condition.wait()
+            # Nobody consumes a closed queue anymore
+            if self.closed: return
+
+            if len(self.items) == self.items.maxlen: self.dropped += 1
+            self.items.append(item)
+            self.condition.notify_all()
+
+    #######################################################################################################################
+
+    def get(self):
+
+        """
+        Waits for the next item.
+
+        Returns:
+            object: Oldest item in the queue, or None once the queue is closed and empty.
+        """
+
+        with self.condition:
+            while not self.items and not self.closed: self.condition.wait()
+            if not self.items: return None
+            item = self.items.popleft()
+            self.condition.notify_all()
+            return item
+
+    #######################################################################################################################
+
+    def close(self, discard = False):
+
+        """
+        Stops accepting items. The consumer still gets the queued items, unless they are discarded because the pipeline
+        is aborting.
+        """
+
+        with self.condition:
+            self.closed = True
+            if discard: self.items.clear()
+            self.condition.notify_all()
+
+###########################################################################################################################
+###########################################################################################################################
+
+class Pipeline:
+
+    """
+    Runs capture, preprocessing and control as independent stages connected by bounded queues:
+
+        capture -> [Drop_Oldest_Queue] -> preprocessing workers -> [Drop_Oldest_Queue] -> state machine
+
+    When paced, the capture stage reads from a live source (a capture card, or video_frames() and synthetic_clip() played
+    in real time) and a latency spike in a later stage drops frames instead of delaying the decisions. Otherwise the
+    queues block and every frame reaches the state machine in capture order, so the result does not depend on timing.
+    """
+
+    def __init__(self, image_class, state_machine, state = 'WAIT_PAIRING_SCREEN', workers = PREPROCESS_WORKERS,
+            queue_size = QUEUE_SIZE):
+
+        self.image_class = image_class
+        self.state_machine = state_machine
+        self.state = state
+        self.workers = workers
+
+        self.capture_queue = Drop_Oldest_Queue(queue_size)
+        self.control_queue = Drop_Oldest_Queue(queue_size)
+
+        self.report = Replay.Replay_Report()
+        self.captured_frames = 0
+        # Frames finished by a preprocessing worker after a newer frame was already handed to the state machine
+        self.stale_frames = 0
+        self.last_frame_index = -1
+        self.last_frame_time = None
+        # Index of every frame handed to the state machine, in processing order
+        self.frame_indices = []
+        # Simulated time per frame when the source is not paced, None when frames arrive in real time
+        self.frame_time = None
+        # First exception raised by a stage, re-raised by run()
+        self.error = None
+
+    #######################################################################################################################
+
+    def stage(self, function, *args):
+        # Runs a stage in its thread. An exception aborts the whole pipeline so no stage waits forever for another one
+        try: function(*args)
+        except BaseException as error:
+            if self.error is None: self.error = error
+            self.capture_queue.close(discard = True)
+            self.control_queue.close(discard = True)
+
+    #######################################################################################################################
+
+    def capture(self, frames, period):
+        next_time = perf_counter()
+        try:
+            for frame in frames:
+                if self.error is not None: break
+                if period:
+                    next_time += period
+                    sleep(max(0, next_time - perf_counter()))
+                self.capture_queue.put((self.captured_frames, perf_counter(), frame))
+                self.captured_frames += 1
+        finally: self.capture_queue.close()
+
+    #######################################################################################################################
+
+    def preprocess(self):
+        while (item := self.capture_queue.get()) is not None:
+            frame_index, capture_time, frame = item
+            start_time = perf_counter()
+            image = self.image_class(frame)
+            image.resize_image()
+            latencies = {'capture_queue': start_time - capture_time, 'preprocess': perf_counter() - start_time}
+            self.control_queue.put((frame_index, perf_counter(), image, latencies))
+
+    #######################################################################################################################
+
+    def control(self):
+        # Frames finished by the workers ahead of an older one, waiting for their turn when the source is not paced
+        pending = {}
+        while (item := self.control_queue.get()) is not None:
+            if self.frame_time:
+                pending[item[0]] = item
+                while self.last_frame_index + 1 in pending: self.decide(*pending.pop(self.last_frame_index + 1))
+
+            # Workers may finish out of order, never go back in time
+            elif item[0] < self.last_frame_index: self.stale_frames += 1
+            else: self.decide(*item)
+
+    #######################################################################################################################
+
+    def decide(self, frame_index, queued_time, image, latencies):
+        # Without pacing, the video time since the last decision is simulated on top of the real time it took
+        if self.frame_time and self.last_frame_index >= 0:
+            Fixtures.advance_time(
+                sys.modules[self.state_machine.__module__], (frame_index - self.last_frame_index) * self.frame_time,
+                perf_counter() - self.last_frame_time
+            )
+        self.last_frame_index = frame_index
+        self.frame_indices.append(frame_index)
+
+        start_time = perf_counter()
+        self.state = self.state_machine(image, self.state)
+        latencies['control_queue'] = start_time - queued_time
+        latencies['state_machine'] = perf_counter() - start_time
+        self.report.add_frame(self.state, latencies)
+        self.last_frame_time = perf_counter()
+
+    #######################################################################################################################
+
+    def run(self, frames, fps = 60, paced = False):
+
+        """
+        Streams frames through the pipeline until the source is exhausted.
+
+        Args:
+            frames (iterable): BGR frames.
+            fps (float): Frame rate of the source.
+            paced (bool): Deliver the frames in real time at fps, as a capture card would, dropping the frames the later
+                stages cannot keep up with. Otherwise frames are fed as fast as the stages take them, none is dropped
+                and the state machines see 1 / fps seconds of simulated time per frame.
+
+        Returns:
+            Replay_Report: State trace and per-stage latencies of the processed frames.
+
+        Raises:
+            Exception: First exception raised by the frame source or by any stage.
+        """
+
+        self.frame_time = None if paced else 1 / fps
+        self.capture_queue.blocking = self.control_queue.blocking = not paced
+
+        start_time = perf_counter()
+        capture_thread = threading.Thread(target = self.stage, args = (self.capture, frames, 1 / fps if paced else 0))
+        worker_threads = [threading.Thread(target = self.stage, args = (self.preprocess,)) for _ in range(self.workers)]
+        control_thread = threading.Thread(target = self.stage, args = (self.control,))
+
+        for thread in [capture_thread, *worker_threads, control_thread]: thread.start()
+        capture_thread.join()
+        for thread in worker_threads: thread.join()
+        self.control_queue.close()
+        control_thread.join()
+
+        if self.error is not None: raise self.error
+        self.report.elapsed_time = perf_counter() - start_time
+        return self.report
+
+    #######################################################################################################################
+
+    def counters(self):
+
+        """
+        Returns:
+            dict: Number of frames captured, processed by the state machine and dropped at every point of the pipeline.
+        """
+
+        return {
+            'captured': self.captured_frames,
+            'processed': self.report.frames,
+            'dropped_capture_queue': self.capture_queue.dropped,
+            'dropped_control_queue': self.control_queue.dropped,
+            'dropped_stale': self.stale_frames,
+        }
+
+###########################################################################################################################
+#####################################################     PROGRAM     #####################################################
+###########################################################################################################################
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Run the staged pipeline on a video or a synthetic clip')
+    parser.add_argument('--video', help = 'Video file to replay (a synthetic clip is generated otherwise)')
+    parser.add_argument('--mode', choices = ['wild', 'static'], default = 'wild')
+    parser.add_argument('--hold', type = int, default = 30, help = 'Frames every image without its own hold is shown')
+    parser.add_argument('--fps', type = float, default = 60, help = 'Frame rate of the source')
+    parser.add_argument('--paced', action = 'store_true', help = 'Deliver the frames in real time at --fps')
+    parser.add_argument('--workers', type = int, default = PREPROCESS_WORKERS, help = 'Preprocessing workers')
+    args = parser.parse_args()
+
+    # Mock Qt modules to make them optional in the pipeline
+    from unittest.mock import MagicMock
+    sys.modules['PyQt5'] = MagicMock()
+    sys.modules['PyQt5.QtGui'] = MagicMock()
+
+    from Image_Processing import Image_Processing
+    import Control_System
+
+    if args.mode == 'wild': clip, state_machine = Replay.WILD_ENCOUNTER_CLIP, Control_System.search_wild_pokemon
+    else: clip, state_machine = Replay.STATIC_ENCOUNTER_CLIP, Control_System.static_encounter
+
+    if args.video: frames = Replay.video_frames(args.video)
+    else: frames = Replay.synthetic_clip(clip, args.hold)
+
+    pipeline = Pipeline(Image_Processing, state_machine, workers = args.workers)
+    print(pipeline.run(frames, args.fps, args.paced))
+    print(pipeline.counters())
@@ -0,0 +1,221 @@
+###########################################################################################################################
+####################################################     LIBRARIES     ####################################################
+###########################################################################################################################
+
+import os
+import json
+import math
+import functools
+import threading
+from collections import deque
+from time import perf_counter
+
+###########################################################################################################################
+#################################################     INITIALIZATIONS     #################################################
+###########################################################################################################################
+
+STATE_MACHINES = ['search_wild_pokemon', 'static_encounter']
+IMAGE_METHODS = ['resize_image', 'recognize_pokemon', 'get_pyqt_image']
+PERCENTILES = [50, 95, 99]
+# Spans kept for the trace export, about 5 minutes of a hunt at 60 FPS. Older spans are only kept as aggregates
+TRACE_SPANS = 200000
+# Latest durations per function the percentiles are computed from
+RECENT_DURATIONS = 10000
+
+###########################################################################################################################
+###########################################################################################################################
+
+def percentile(values, percent):
+
+    """
+    Returns the nearest-rank percentile of a list of values. Used by every report (Profiler, Replay, Benchmark), so p95
+    means the same thing everywhere.
+    """
+
+    values = sorted(values)
+    return values[max(0, math.ceil(percent / 100 * len(values)) - 1)]
+
+###########################################################################################################################
+###########################################################################################################################
+
+class Profiler:
+
+    """
+    Opt-in instrumentation of the state machines. While enabled, every detector call, resize_image, recognize_pokemon and
+    get_pyqt_image is recorded as a span tagged with the current state, and state dwell times and transitions are
+    counted. Nothing is wrapped while the profiler is disabled, so it costs nothing in production.
+
+    Memory is bounded for hunts of any length: call counts, totals and maxima are aggregated online, percentiles use the
+    latest RECENT_DURATIONS calls of each function and the trace keeps the latest trace_spans spans. Spans recorded on
+    another thread than the state machine (e.g. the preprocessing workers of Pipeline) run concurrently with whatever state
+    the state machine is in, so they are tagged with state None and exported on their own thread track.
+    """
+
+    def __init__(self, trace_spans = TRACE_SPANS):
+        self.spans = deque(maxlen = trace_spans)
+        self.functions = {}
+        self.state = None
+        self.state_thread = None
+        self.state_start_time = None
+        self.state_dwell = {}
+        self.state_frames = {}
+        self.transitions = {}
+        self.originals = []
+        self.lock = threading.Lock()
+        # Nesting depth of the state machines, per thread
+        self.local = threading.local()
+        self.start_time = perf_counter()
+
+    #######################################################################################################################
+
+    def enable(self, control_system, image_class):
+
+        """
+        Wraps the state machines and detectors of Control_System and the frame methods of Image_Processing.
+
+        Args:
+            control_system (module): Control_System module.
+            image_class (type): Image_Processing class.
+        """
+
+        if self.originals: return
+
+        detectors = [name for name in dir(control_system) if name.startswith('is_') and name.endswith('_visible')]
+        for name in detectors: self._wrap(control_system, name, self._span)
+        for name in STATE_MACHINES:
+            if hasattr(control_system, name): self._wrap(control_system, name, self._state_machine)
+        for name in IMAGE_METHODS:
+            if hasattr(image_class, name): self._wrap(image_class, name, self._span)
+
+    #######################################################################################################################
+
+    def disable(self):
+
+        """
+        Restores every wrapped function and closes the dwell time of the current state.
+        """
+
+        for owner, name, function in reversed(self.originals): setattr(owner, name, function)
+        self.originals = []
+        self._enter_state(None)
+
+    #######################################################################################################################
+
+    def _wrap(self, owner, name, wrapper_factory):
+        function = getattr(owner, name)
+        self.originals.append((owner, name, function))
+        setattr(owner, name, functools.wraps(function)(wrapper_factory(name, function)))
+
+    #######################################################################################################################
+
+    def _record(self, name, state, start_time, duration):
+        thread = threading.get_ident()
+        if thread != self.state_thread: state = None
+
+        with self.lock:
+            stats = self.functions.get(name)
+            if stats is None:
+                stats = self.functions[name] = {
+                    'calls': 0, 'total': 0, 'max': 0, 'by_state': {}, 'recent': deque(maxlen = RECENT_DURATIONS)
+                }
+            stats['calls'] += 1
+            stats['total'] += duration
+            stats['max'] = max(stats['max'], duration)
+            stats['by_state'][str(state)] = stats['by_state'].get(str(state), 0) + 1
+            stats['recent'].append(duration)
+            self.spans.append((name, state, start_time, duration, thread))
+
+    #######################################################################################################################
+
+    def _span(self, name, function):
+        def wrapper(*args, **kwargs):
+            start_time = perf_counter()
+            try: return function(*args, **kwargs)
+            finally: self._record(name, self.state, start_time, perf_counter() - start_time)
+        return wrapper
+
+    #######################################################################################################################
+
+    def _state_machine(self, name, function):
+        def wrapper(image, state, *args, **kwargs):
+            # A state machine may delegate to the other one, only the outermost call is a new frame
+            depth = getattr(self.local, 'depth', 0)
+            if depth: return function(image, state, *args, **kwargs)
+
+            self.state_thread = threading.get_ident()
+            if state != self.state: self._enter_state(state)
+            self.state_frames[state] = self.state_frames.get(state, 0) + 1
+
+            start_time = perf_counter()
+            self.local.depth = depth + 1
+            try: new_state = function(image, state, *args, **kwargs)
+            finally:
+                self.local.depth = depth
+                self._record(name, state, start_time, perf_counter() - start_time)
+
+            if new_state != state:
+                self.transitions[(state, new_state)] = self.transitions.get((state, new_state), 0) + 1
+                self._enter_state(new_state)
+            return new_state
+        return wrapper
+
+    #######################################################################################################################
+
+    def _enter_state(self, state):
+        now = perf_counter()
+        if self.state is not None:
+            self.state_dwell[self.state] = self.state_dwell.get(self.state, 0) + now - self.state_start_time
+        self.state, self.state_start_time = state, now
+
+    #######################################################################################################################
+
+    def histograms(self):
+
+        """
+        Returns:
+            dict: {function: {'calls', 'mean', 'p50', 'p95', 'p99', 'max', 'by_state': {state: calls}}} in milliseconds.
+                Percentiles are computed over the latest RECENT_DURATIONS calls.
+        """
+
+        histograms = {}
+        with self.lock:
+            for name, stats in self.functions.items():
+                histograms[name] = {
+                    'calls': stats['calls'], 'mean': 1000 * stats['total'] / stats['calls'], 'max': 1000 * stats['max']
+                }
+                recent = [1000 * duration for duration in stats['recent']]
+                for percent in PERCENTILES: histograms[name][f'p{percent}'] = percentile(recent, percent)
+                histograms[name]['by_state'] = dict(stats['by_state'])
+        return histograms
+
+    #######################################################################################################################
+
+    def export(self, path):
+
+        """
+        Writes a Chrome trace (chrome://tracing, Perfetto) with one complete event per kept span, one track per thread.
+        The histograms, state dwell times and transition counts are stored in the same file.
+
+        Args:
+            path (str): Output JSON file.
+        """
+
+        categories = {**{name: 'state_machine' for name in STATE_MACHINES}, **{name: 'image' for name in IMAGE_METHODS}}
+        with self.lock: spans = list(self.spans)
+        events = [
+            {
+                'name': name, 'cat': categories.get(name, 'detector'), 'ph': 'X',
+                'ts': 1e6 * (start_time - self.start_time), 'dur': 1e6 * duration, 'pid': os.getpid(), 'tid': thread,
+                'args': {'state': state}
+            }
+            for name, state, start_time, duration, thread in spans
+        ]
+
+        with open(path, 'w') as file:
+            json.dump({
+                'traceEvents': events,
+                'histograms': self.histograms(),
+                'state_dwell': self.state_dwell,
+                'state_frames': self.state_frames,
+                'transitions': {f'{old} -> {new}': count for (old, new), count in self.transitions.items()},
+            }, file, indent = 4)
@@ -0,0 +1,276 @@
+###########################################################################################################################
+####################################################     LIBRARIES     ####################################################
+###########################################################################################################################
+
+# Set the cwd to the one of the file
+import os
+if __name__ == '__main__':
+    try: os.chdir(os.path.dirname(__file__))
+    except: pass
+
+import cv2
+import argparse
+from time import perf_counter
+
+import sys
+folders = ['./', '../', '../Modules']
+for folder in folders: sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), folder)))
+
+import Constants as CONST
+import Fixtures
+from Profiler import percentile
+
+###########################################################################################################################
+#################################################     INITIALIZATIONS     #################################################
+###########################################################################################################################
+
+VIDEO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), 'Media/Videos'))
+
+# Opening the game followed by the not shiny wild encounter of test_State_Machine.py (case 1), one image per hold.
+# Holds of at least 0.5 s (30 frames at 60 FPS) are needed to leave ENTER_COMBAT_1
+WILD_ENCOUNTER_CLIP = [
+    'Pairing_Screen_1080p.png', 'Home_Screen_1080p.png', 'Overworld_Cave_1080p.png', 'White_Load_Screen_1080p.png',
+    'Geodude_Combat_1080p.png', 'Dialga_Animation_1080p.png', 'Geodude_Combat_1080p.png', 'Dialga_Animation_1080p.png',
+    'Geodude_Combat_1080p.png', 'Combat_Screen_1080p.png', 'Geodude_Combat_1080p.png', 'Dialga_Animation_1080p.png',
+    'Black_Load_Screen_1080p.png', 'Overworld_Cave_1080p.png'
+]
+# Opening the game, the not shiny static encounter of test_State_Machine.py and the game restart. The white load screen
+# is held for CONST.STATIC_ENCOUNTERS_DELAY plus one regular hold (at 60 FPS) to leave ENTER_STATIC_COMBAT_3
+STATIC_ENCOUNTER_CLIP = [
+    'Pairing_Screen_1080p.png', 'Home_Screen_1080p.png', 'Overworld_Cave_1080p.png', 'Overworld_Text_Box_1080p.png',
+    'Dialga_Animation_1080p.png', ('White_Load_Screen_1080p.png', round(60 * CONST.STATIC_ENCOUNTERS_DELAY) + 30),
+    'Dialga_Animation_1080p.png', 'Geodude_Combat_1080p.png', 'Dialga_Animation_1080p.png', 'Geodude_Combat_1080p.png',
+    'BDSP_Load_Screen_1_1080p.png', 'BDSP_Load_Screen_2_1080p.png', 'BDSP_Load_Screen_3_1080p.png',
+    'Dialga_Animation_1080p.png', 'BDSP_Load_Screen_2_1080p.png', 'Overworld_Cave_1080p.png'
+]
+
+###########################################################################################################################
+###########################################################################################################################
+
+def video_frames(video_path):
+
+    """
+    Streams the frames of a video file.
+
+    Args:
+        video_path (str): Path to the video file.
+
+    Yields:
+        numpy.ndarray: Decoded BGR frame.
+    """
+
+    capture = cv2.VideoCapture(video_path)
+    if not capture.isOpened(): raise FileNotFoundError(f'Could not open video: {video_path}')
+
+    try:
+        while True:
+            success, frame = capture.read()
+            if not success: break
+            yield frame
+    finally: capture.release()
+
+###########################################################################################################################
+###########################################################################################################################
+
+def clip_holds(clip, hold_frames = 30):
+
+    """
+    Returns:
+        list: (image name, hold frames) of every entry of a clip. Entries are either an image name, held for hold_frames,
+            or an (image name, hold frames) pair.
+    """
+
+    return [(entry, hold_frames) if isinstance(entry, str) else tuple(entry) for entry in clip]
+
+###########################################################################################################################
+###########################################################################################################################
+
+def synthetic_clip(clip, hold_frames = 30, transition_frames = 0):
+
+    """
+    Streams a synthetic clip built from the images in Media/Images. Each image is held for a number of frames and, if
+    requested, blended into the next one to mimic the fades of the game.
+
+    Args:
+        clip (list): Images in Media/Images in playback order, as file names or (file name, hold frames) pairs.
+        hold_frames (int): Number of frames an image given by its file name alone is shown.
+        transition_frames (int): Number of cross-fade frames between two consecutive images.
+
+    Yields:
+        numpy.ndarray: BGR frame.
+    """
+
+    holds = clip_holds(clip, hold_frames)
+    frames = [Fixtures.load_frame(os.path.join(Fixtures.IMAGE_DIR, image_name)) for image_name, _ in holds]
+
+    # Every captured frame is a new buffer, hand out copies so Image_Processing can modify them in place
+    for index, (frame, (_, frame_count)) in enumerate(zip(frames, holds)):
+        for _ in range(frame_count): yield frame.copy()
+
+        if index + 1 == len(frames): break
+        next_frame = frames[index + 1]
+        if next_frame.shape != frame.shape: continue
+        for step in range(1, transition_frames + 1):
+            alpha = step / (transition_frames + 1)
+            yield cv2.addWeighted(frame, 1 - alpha, next_frame, alpha, 0)
+
+###########################################################################################################################
+###########################################################################################################################
+
+class Replay_Report:
+
+    """
+    Collects the result of a replay: the state trace, the achieved frame rate and the latency of every stage.
+    """
+
+    def __init__(self):
+        self.frames = 0
+        self.elapsed_time = 0
+        self.state_trace = []
+        self.stage_latencies = {}
+
+    #######################################################################################################################
+
+    def add_frame(self, state, latencies):
+        self.frames += 1
+        if not self.state_trace or self.state_trace[-1] != state: self.state_trace.append(state)
+        for stage, latency in latencies.items(): self.stage_latencies.setdefault(stage, []).append(latency)
+
+    #######################################################################################################################
+
+    def fps(self):
+        return self.frames / self.elapsed_time if self.elapsed_time else 0
+
+    #######################################################################################################################
+
+    def keeps_up(self, target_fps):
+        return self.fps() >= target_fps
+
+    #######################################################################################################################
+
+    def latency_summary(self):
+
+        """
+        Returns:
+            dict: {stage: {'mean': float, 'p95': float, 'max': float}} in milliseconds.
+        """
+
+        summary = {}
+        for stage, latencies in self.stage_latencies.items():
+            summary[stage] = {
+                'mean': 1000 * sum(latencies) / len(latencies),
+                'p95': 1000 * percentile(latencies, 95),
+                'max': 1000 * max(latencies),
+            }
+        return summary
+
+    #######################################################################################################################
+
+    def __str__(self):
+        lines = [f'Frames: {self.frames} | FPS: {self.fps():.1f}', 'States: ' + ' -> '.join(self.state_trace)]
+        for stage, stats in self.latency_summary().items():
+            lines.append(f'{stage}: mean {stats["mean"]:.2f} ms | p95 {stats["p95"]:.2f} ms | max {stats["max"]:.2f} ms')
+        return '\n'.join(lines)
+
+###########################################################################################################################
+###########################################################################################################################
+
+def preprocess(frames, image_class):
+
+    """
+    Pipeline stage that wraps every frame in an Image_Processing object and resizes it.
+
+    Yields:
+        tuple: (Image_Processing, {stage: seconds})
+    """
+
+    for frame in frames:
+        start_time = perf_counter()
+        image = image_class(frame)
+        image.resize_image()
+        yield image, {'preprocess': perf_counter() - start_time}
+
+###########################################################################################################################
+###########################################################################################################################
+
+def run_state_machine(images, state_machine, state, fps):
+
+    """
+    Pipeline stage that feeds every image into a state machine (search_wild_pokemon or static_encounter). The state
+    machines time themselves against the wall clock, so after every frame the real time it took is topped up (or wound
+    back) to exactly 1 / fps seconds. The replay runs at CPU speed but its timeouts expire after the same number of frames
+    as in a live capture, whatever the speed of the host.
+
+    Yields:
+        tuple: (state after the frame, {stage: seconds})
+    """
+
+    control_system = sys.modules[state_machine.__module__]
+    frame_start_time = perf_counter()
+    for image, latencies in images:
+        start_time = perf_counter()
+        state = state_machine(image, state)
+        latencies['state_machine'] = perf_counter() - start_time
+
+        # Preprocessing and the consumer of the previous frame also ran on the wall clock since the last frame
+        now = perf_counter()
+        Fixtures.advance_time(control_system, 1 / fps, now - frame_start_time)
+        frame_start_time = now
+        yield state, latencies
+
+###########################################################################################################################
+###########################################################################################################################
+
+def replay(frames, image_class, state_machine, state = 'WAIT_PAIRING_SCREEN', fps = 60):
+
+    """
+    Streams frames through Image_Processing and a state machine as fast as possible.
+
+    Args:
+        frames (iterable): BGR frames, e.g. from video_frames() or synthetic_clip().
+        image_class (type): Image_Processing class.
+        state_machine (callable): Control_System.search_wild_pokemon or Control_System.static_encounter.
+        state (str): Initial state.
+        fps (float): Frame rate of the clip, sets the simulated time between two frames.
+
+    Returns:
+        Replay_Report: Trace and performance of the replay.
+    """
+
+    report = Replay_Report()
+    start_time = perf_counter()
+    for state, latencies in run_state_machine(preprocess(frames, image_class), state_machine, state, fps):
+        report.add_frame(state, latencies)
+    report.elapsed_time = perf_counter() - start_time
+    return report
+
+###########################################################################################################################
+#####################################################     PROGRAM     #####################################################
+###########################################################################################################################
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Replay a video or a synthetic clip through the state machines')
+    parser.add_argument('--video', help = 'Video file to replay (a synthetic clip is generated otherwise)')
+    parser.add_argument('--mode', choices = ['wild', 'static'], default = 'wild')
+    parser.add_argument('--hold', type = int, default = 30, help = 'Frames every image without its own hold is shown')
+    parser.add_argument('--transition', type = int, default = 0, help = 'Cross-fade frames in the synthetic clip')
+    parser.add_argument('--fps', type = float, default = 60, help = 'Frame rate of the clip, the replay has to keep up')
+    args = parser.parse_args()
+
+    # Mock Qt modules to make them optional in the replay
+    from unittest.mock import MagicMock
+    sys.modules['PyQt5'] = MagicMock()
+    sys.modules['PyQt5.QtGui'] = MagicMock()
+
+    from Image_Processing import Image_Processing
+    import Control_System
+
+    if args.mode == 'wild': clip, state_machine = WILD_ENCOUNTER_CLIP, Control_System.search_wild_pokemon
+    else: clip, state_machine = STATIC_ENCOUNTER_CLIP, Control_System.static_encounter
+
+    if args.video: frames = video_frames(args.video)
+    else: frames = synthetic_clip(clip, args.hold, args.transition)
+
+    report = replay(frames, Image_Processing, state_machine, fps = args.fps)
+    print(report)
+    print(f'Keeps up with {args.fps:g} FPS: {report.keeps_up(args.fps)}')
@@ -0,0 +1,547 @@
+###########################################################################################################################
+####################################################     LIBRARIES     ####################################################
+###########################################################################################################################
+
+# Set the cwd to the one of the file
+import os
+if __name__ == '__main__':
+    try: os.chdir(os.path.dirname(__file__))
+    except: pass
+
+import re
+import sys
+import json
+import hashlib
+import inspect
+import argparse
+import functools
+import unittest
+import traceback
+import contextlib
+import multiprocessing
+from time import perf_counter
+from multiprocessing import shared_memory
+
+folders = ['./', '../', '../Modules']
+for folder in folders: sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), folder)))
+
+import numpy as np
+import Fixtures
+
+###########################################################################################################################
+#################################################     INITIALIZATIONS     #################################################
+###########################################################################################################################
+
+TEST_MODULES = ['test_Control_System', 'test_Image_Processing', 'test_State_Machine', 'test_Replay', 'test_Pipeline',
+    'test_Profiler', 'test_Allocations']
+RESULTS_FILE = os.path.join(Fixtures.CACHE_DIR, 'Test_Results.json')
+
+# Modules that import the real PyQt5. The other test modules replace it with a MagicMock, so they never share a process
+ISOLATED_MODULES = ['test_Image_Processing']
+
+# Shared memory blocks attached by a worker, kept alive for the whole life of the process
+_shared_blocks = []
+
+###########################################################################################################################
+###########################################################################################################################
+
+class Test_Id:
+
+    """
+    Picklable stand-in for a test case that ran in another process, so the results can be reported with unittest.
+    """
+
+    def __init__(self, test_id):
+        self.test_id = test_id
+
+    def id(self): return self.test_id
+    def shortDescription(self): return None
+    def __str__(self): return self.test_id
+
+###########################################################################################################################
+###########################################################################################################################
+
+class Timed_Result(unittest.TestResult):
+
+    """
+    Collects the outcome and duration of every test as plain data that can be sent back to the main process.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self.start_time = 0
+
+    def startTest(self, test):
+        super().startTest(test)
+        self.start_time = perf_counter()
+
+    def record(self, test, outcome, details = ''):
+        self.records.append({
+            'id': test.id(), 'outcome': outcome, 'details': details, 'time': perf_counter() - self.start_time
+        })
+
+    def addSuccess(self, test): self.record(test, 'success')
+    def addFailure(self, test, err): self.record(test, 'failure', self._exc_info_to_string(err, test))
+    def addError(self, test, err): self.record(test, 'error', self._exc_info_to_string(err, test))
+    def addSkip(self, test, reason): self.record(test, 'skip', reason)
+    def addExpectedFailure(self, test, err): self.record(test, 'expected_failure')
+    def addUnexpectedSuccess(self, test): self.record(test, 'unexpected_success')
+
+    def addSubTest(self, test, subtest, err):
+        if err is None: return
+        outcome = 'failure' if issubclass(err[0], test.failureException) else 'error'
+        self.record(subtest, outcome, self._exc_info_to_string(err, test))
+
+###########################################################################################################################
+###########################################################################################################################
+
+def share_frames():
+
+    """
+    Decodes every fixture image once and copies it into a shared memory block.
+
+    Returns:
+        tuple: (list of SharedMemory blocks to release, {image_path: (block name, shape, dtype)} registry)
+    """
+
+    blocks, registry = [], {}
+    for image_name in sorted(os.listdir(Fixtures.IMAGE_DIR)):
+        if not image_name.endswith('.png'): continue
+        image_path = os.path.join(Fixtures.IMAGE_DIR, image_name)
+        frame = Fixtures.load_frame(image_path)
+
+        block = shared_memory.SharedMemory(create = True, size = frame.nbytes)
+        np.ndarray(frame.shape, frame.dtype, buffer = block.buf)[:] = frame
+        blocks.append(block)
+        registry[image_path] = (block.name, frame.shape, frame.dtype.str)
+    return blocks, registry
+
+###########################################################################################################################
+###########################################################################################################################
+
+def attach_frames(registry):
+
+    """
+    Worker initializer. Makes Fixtures serve the frames from the shared memory blocks instead of decoding them.
+    """
+
+    for image_path, (name, shape, dtype) in registry.items():
+        block = shared_memory.SharedMemory(name = name)
+        _shared_blocks.append(block)
+
+        frame = np.ndarray(shape, np.dtype(dtype), buffer = block.buf)
+        frame.flags.writeable = False
+        Fixtures._frames[image_path] = frame
+
+###########################################################################################################################
+###########################################################################################################################
+
+def run_shard(test_ids):
+
+    """
+    Runs a group of tests inside a worker process.
+
+    Returns:
+        list: {'id', 'outcome', 'details', 'time'} for every test.
+    """
+
+    result = Timed_Result()
+    try: unittest.defaultTestLoader.loadTestsFromNames(test_ids).run(result)
+    except Exception:
+        details = traceback.format_exc()
+        return [{'id': test_id, 'outcome': 'error', 'details': details, 'time': 0} for test_id in test_ids]
+    return result.records
+
+###########################################################################################################################
+###########################################################################################################################
+
+def collect_tests(modules):
+
+    """
+    Returns:
+        dict: {test class id: [test cases]}, one entry per (parameterized) test class.
+    """
+
+    def flatten(suite):
+        for item in suite:
+            if isinstance(item, unittest.TestSuite): yield from flatten(item)
+            else: yield item
+
+    test_classes = {}
+    for test in flatten(unittest.defaultTestLoader.loadTestsFromNames(modules)):
+        test_classes.setdefault(test.id().rsplit('.', 1)[0], []).append(test)
+    return test_classes
+
+###########################################################################################################################
+###########################################################################################################################
+
+@functools.lru_cache(maxsize = None)
+def hash_file(path):
+    # Memoized, the fixture images and helper modules are shared by every test of a run
+    with open(path, 'rb') as file: return hashlib.sha256(file.read()).hexdigest()
+
+###########################################################################################################################
+###########################################################################################################################
+
+def get_source(function):
+    try: return inspect.getsource(function)
+    except (OSError, TypeError): return ''
+
+###########################################################################################################################
+###########################################################################################################################
+
+def describe(value, seen = ()):
+
+    """
+    Returns a stable description of a value for a test key, identical across processes and runs: the hash of the source
+    of functions and classes, the hash of the content of numpy arrays, the description of every item of containers (sets
+    in sorted order), and the repr of anything else without memory addresses or mock ids.
+    """
+
+    if id(value) in seen: return '...'
+    if inspect.isfunction(value) or inspect.isclass(value) or inspect.ismethod(value):
+        source = get_source(value)
+        if source: return hashlib.sha256(source.encode()).hexdigest()
+    if isinstance(value, np.ndarray):
+        content = hashlib.sha256(np.ascontiguousarray(value).tobytes()).hexdigest()
+        return f'ndarray({value.shape}, {value.dtype.str}, {content})'
+
+    seen = (*seen, id(value))
+    if isinstance(value, dict):
+        items = sorted(f'{describe(key, seen)}: {describe(item, seen)}' for key, item in value.items())
+        return '{' + ', '.join(items) + '}'
+    if isinstance(value, (set, frozenset)): return '{' + ', '.join(sorted(describe(item, seen) for item in value)) + '}'
+    if isinstance(value, (list, tuple)):
+        return type(value).__name__ + '(' + ', '.join(describe(item, seen) for item in value) + ')'
+    return re.sub(r" at 0x[0-9a-fA-F]+| id='\d+'", '', repr(value))
+
+###########################################################################################################################
+###########################################################################################################################
+
+def referenced_functions(value, seen = ()):
+
+    """
+    Yields the functions stored in a value, e.g. the detectors of a per-state table, so they are walked like called ones.
+    """
+
+    if id(value) in seen: return
+    if inspect.isfunction(value): yield value
+    elif isinstance(value, dict):
+        for item in [*value.keys(), *value.values()]: yield from referenced_functions(item, (*seen, id(value)))
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value: yield from referenced_functions(item, (*seen, id(value)))
+
+###########################################################################################################################
+###########################################################################################################################
+
+def reference_keys(module, source, skipped = ()):
+
+    """
+    Describes the module-level names a source uses: thresholds and other globals by value, functions imported from other
+    modules by source, and the attributes used of imported modules (CONST.X, Helpers.function) by value or source.
+
+    Args:
+        module (module): Module the source belongs to.
+        source (str): Source code of a function or method of the module.
+        skipped (tuple): Values already covered by the key, e.g. the functions walked by test_key.
+
+    Returns:
+        list: 'name=description' entries.
+    """
+
+    keys = []
+    module_globals = vars(module)
+    for name in sorted(set(re.findall(r'\b([A-Za-z_]\w*)\b', source)) & set(module_globals)):
+        value = module_globals[name]
+        if name.startswith('__') or any(value is skipped_value for skipped_value in skipped): continue
+        if inspect.ismodule(value):
+            for attribute in sorted(set(re.findall(rf'\b{name}\.(\w+)', source))):
+                keys.append(f'{name}.{attribute}={describe(getattr(value, attribute, None))}')
+        elif not (inspect.isfunction(value) and value.__module__ == module.__name__):
+            keys.append(f'{name}={describe(value)}')
+    return keys
+
+###########################################################################################################################
+###########################################################################################################################
+
+def test_key(test):
+
+    """
+    Computes the content key of a test: the fixture image it runs on, the source of the test, the source of every
+    Control_System function and Image_Processing method it can reach, and the module-level values and imported helpers
+    they use (Constants entries, thresholds...). A test whose key did not change since its last successful run does not
+    need to run again.
+
+    Args:
+        test (unittest.TestCase): Loaded test case.
+
+    Returns:
+        str: SHA-256 hex digest of the key.
+    """
+
+    control_system = sys.modules.get('Control_System')
+    image_processing = sys.modules.get('Image_Processing') or sys.modules.get('Modules.Image_Processing')
+
+    functions = {
+        name: function for name, function in vars(control_system).items()
+        if inspect.isfunction(function) and function.__module__ == control_system.__name__
+    } if control_system else {}
+    image_class = getattr(image_processing, 'Image_Processing', None)
+    methods = {name: function for name, function in vars(image_class).items() if inspect.isfunction(function)} \
+        if image_class else {}
+
+    # Source of the test module and of the helper modules it may import (Fixtures, Replay, Pipeline...)
+    key = [hash_file(inspect.getfile(type(test)))]
+    helper_directory = os.path.dirname(os.path.abspath(__file__))
+    for file_name in sorted(os.listdir(helper_directory)):
+        if file_name.endswith('.py') and not file_name.startswith('test_'):
+            key.append(hash_file(os.path.join(helper_directory, file_name)))
+
+    # Parameters of a parameterized case (expected results), and the image it runs on
+    parameters = {
+        name: value for name, value in vars(type(test)).items()
+        if not name.startswith('_') and not callable(value) and isinstance(value, (str, int, float, bool, list, dict))
+    }
+    key.append(json.dumps(parameters, sort_keys = True))
+    image_path = parameters.get('image_path')
+    if image_path and os.path.exists(image_path): key.append(hash_file(image_path))
+    else:
+        for image_name in sorted(os.listdir(Fixtures.IMAGE_DIR)):
+            key.append(hash_file(os.path.join(Fixtures.IMAGE_DIR, image_name)))
+
+    # Source of the test method, setUp and the helpers of the test class it calls
+    test_class = type(test)
+    names = {test._testMethodName, 'setUp'}
+    names |= set(re.findall(r'self\.(\w+)\(', get_source(getattr(test_class, test._testMethodName, None))))
+    test_source = '\n'.join(
+        get_source(getattr(test_class, name)) for name in sorted(names)
+        if inspect.isfunction(getattr(test_class, name, None)) and
+            getattr(test_class, name).__module__ == test_class.__module__
+    )
+
+    # Control_System functions reached from the test, directly or through other functions
+    if 'getattr(Control_System' in test_source: pending = set(functions)
+    else: pending = set(re.findall(r'Control_System\.(\w+)', test_source)) & set(functions)
+    pending_methods = set(re.findall(r'\.(\w+)\(', test_source) + ['__init__']) & set(methods)
+
+    test_module = sys.modules[test_class.__module__]
+    sources, visited = [(test_module, test_source)], set()
+    while pending or pending_methods:
+        if pending:
+            name = pending.pop()
+            if name in visited: continue
+            visited.add(name)
+            source, module = get_source(functions[name]), control_system
+
+            # Functions called or referenced by bare name (callbacks), and the ones stored in module-level tables
+            names = set(re.findall(r'\b([A-Za-z_]\w*)\b', source))
+            pending |= (names & set(functions)) - visited
+            for table in names & set(vars(control_system)):
+                pending |= {
+                    function.__name__ for function in referenced_functions(vars(control_system)[table])
+                    if functions.get(function.__name__) is function
+                } - visited
+        else:
+            name = pending_methods.pop()
+            if f'Image_Processing.{name}' in visited: continue
+            visited.add(f'Image_Processing.{name}')
+            source, module = get_source(methods[name]), image_processing
+        pending_methods |= {
+            method for method in set(re.findall(r'\.(\w+)\(', source)) & set(methods)
+            if f'Image_Processing.{method}' not in visited
+        }
+        sources.append((module, source))
+        key.append(hashlib.sha256(source.encode()).hexdigest())
+
+    # Module-level values and imported helpers used by any of those sources
+    for module, source in sources:
+        key.extend(reference_keys(module, source, skipped = (image_class, control_system)))
+
+    return hashlib.sha256('\n'.join(key).encode()).hexdigest()
+
+###########################################################################################################################
+###########################################################################################################################
+
+def load_results():
+    if not os.path.exists(RESULTS_FILE): return {}
+    with open(RESULTS_FILE, 'r') as file: return json.load(file)
+
+###########################################################################################################################
+###########################################################################################################################
+
+def store_results(results, records, keys):
+
+    """
+    Stores the key and outcome of every test that ran, keeping the entries of the tests that were not selected.
+    """
+
+    for record in records:
+        if record['id'] in keys: results[record['id']] = {'key': keys[record['id']], 'outcome': record['outcome']}
+
+    os.makedirs(Fixtures.CACHE_DIR, exist_ok = True)
+    with open(RESULTS_FILE, 'w') as file: json.dump(results, file, indent = 4, sort_keys = True)
+
+###########################################################################################################################
+###########################################################################################################################
+
+def report(records, stream = sys.stderr, verbosity = 1, slowest = 10):
+
+    """
+    Reports the records of all the workers through a unittest TextTestResult.
+
+    Returns:
+        unittest.TextTestResult: Aggregated result.
+    """
+
+    result = unittest.TextTestResult(unittest.runner._WritelnDecorator(stream), True, verbosity)
+    for record in sorted(records, key = lambda record: record['id']):
+        test = Test_Id(record['id'])
+        result.testsRun += 1
+        if record['outcome'] == 'failure': result.failures.append((test, record['details']))
+        elif record['outcome'] == 'error': result.errors.append((test, record['details']))
+        elif record['outcome'] == 'skip': result.skipped.append((test, record['details']))
+        elif record['outcome'] == 'expected_failure': result.expectedFailures.append((test, record['details']))
+        elif record['outcome'] == 'unexpected_success': result.unexpectedSuccesses.append(test)
+        if verbosity > 1: stream.write(f'{record["id"]} ... {record["outcome"]} ({1000 * record["time"]:.1f} ms)\n')
+
+    result.printErrors()
+
+    stream.write(f'\nSlowest {slowest} tests:\n')
+    for record in sorted(records, key = lambda record: record['time'], reverse = True)[:slowest]:
+        stream.write(f'{1000 * record["time"]:>10.1f} ms  {record["id"]}\n')
+    return result
+
+###########################################################################################################################
+###########################################################################################################################
+
+def group_modules(modules):
+
+    """
+    Splits the test modules into groups that can be loaded in the same process: one group per isolated module and one
+    group with all the others.
+
+    Returns:
+        list: Lists of module names.
+    """
+
+    shared_modules = [module for module in modules if module not in ISOLATED_MODULES]
+    return ([shared_modules] if shared_modules else []) + [[module] for module in modules if module in ISOLATED_MODULES]
+
+###########################################################################################################################
+###########################################################################################################################
+
+def collect_group(modules):
+
+    """
+    Loads the tests of a group of modules and computes their keys. Runs in a fresh process, so the main process never
+    imports a test module. Modules that fail to import are run right away and reported as errors.
+
+    Returns:
+        dict: {'classes': {test class id: [[test id, key]]}, 'errors': [records]}
+    """
+
+    classes, errors = {}, []
+    for class_id, tests in collect_tests(modules).items():
+        for test in tests:
+            if isinstance(test, unittest.loader._FailedTest):
+                result = Timed_Result()
+                test.run(result)
+                errors.extend(result.records)
+            else: classes.setdefault(class_id, []).append([test.id(), test_key(test)])
+    return {'classes': classes, 'errors': errors}
+
+###########################################################################################################################
+###########################################################################################################################
+
+def make_shards(test_classes, workers):
+
+    """
+    Balances test classes across shards by number of tests, biggest classes first.
+    """
+
+    shards = [[] for _ in range(max(1, workers))]
+    for test_ids in sorted(test_classes, key = len, reverse = True):
+        min(shards, key = len).extend(test_ids)
+    return [shard for shard in shards if shard]
+
+###########################################################################################################################
+###########################################################################################################################
+
+def run(modules, workers, full = False):
+
+    """
+    Shards the test classes across worker processes that share the decoded fixture frames. Every group of modules gets
+    its own workers, so a module importing the real PyQt5 never runs next to one that mocks it. Unless a full run is
+    forced, tests whose key matches their last successful run are not executed and are reported as skipped.
+
+    Returns:
+        list: Records of every test.
+    """
+
+    groups = group_modules(modules)
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(len(groups), maxtasksperchild = 1) as pool:
+        collected_groups = pool.map(collect_group, groups, chunksize = 1)
+
+    results = {} if full else load_results()
+    keys, records, group_classes = {}, [], []
+    for collected in collected_groups:
+        records.extend(collected['errors'])
+        selected_classes = []
+        for test_entries in collected['classes'].values():
+            selected_ids = []
+            for test_id, key in test_entries:
+                keys[test_id] = key
+                previous = results.get(test_id, {})
+                if previous.get('key') == key and previous.get('outcome') in ('success', 'skip'):
+                    records.append({'id': test_id, 'outcome': 'skip', 'details': 'unchanged since the last run', 'time': 0})
+                else: selected_ids.append(test_id)
+            if selected_ids: selected_classes.append(selected_ids)
+        if selected_classes: group_classes.append(selected_classes)
+    if not group_classes: return records
+
+    # Workers are split between the groups according to their number of tests
+    total_tests = sum(len(test_ids) for selected_classes in group_classes for test_ids in selected_classes)
+    blocks, registry = share_frames()
+    try:
+        with contextlib.ExitStack() as stack:
+            pending = []
+            for selected_classes in group_classes:
+                group_tests = sum(len(test_ids) for test_ids in selected_classes)
+                shards = make_shards(selected_classes, max(1, round(workers * group_tests / total_tests)))
+                pool = stack.enter_context(context.Pool(len(shards), initializer = attach_frames, initargs = (registry,)))
+                pending.append(pool.map_async(run_shard, shards))
+            run_records = [record for result in pending for records in result.get() for record in records]
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    # Forget the previous outcome of every test that ran. A test with a failing sub-test gets no record of its own, so it
+    # stays out of the store and runs again next time
+    for selected_classes in group_classes:
+        for test_ids in selected_classes:
+            for test_id in test_ids: results.pop(test_id, None)
+    store_results(results, run_records, keys)
+    return records + run_records
+
+###########################################################################################################################
+#####################################################     PROGRAM     #####################################################
+###########################################################################################################################
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Run the unit tests sharded across worker processes')
+    parser.add_argument('modules', nargs = '*', default = TEST_MODULES, help = 'Test modules to run')
+    parser.add_argument('--workers', type = int, default = os.cpu_count(), help = 'Number of worker processes')
+    parser.add_argument('-v', '--verbose', action = 'store_true', help = 'Print every test with its duration')
+    parser.add_argument('--full', action = 'store_true', help = 'Run every test, even if nothing changed since last run')
+    args = parser.parse_args()
+
+    start_time = perf_counter()
+    records = run(args.modules, args.workers, args.full)
+    result = report(records, verbosity = 2 if args.verbose else 1)
+
+    sys.stderr.write(f'\nRan {result.testsRun} tests in {perf_counter() - start_time:.3f}s\n')
+    sys.stderr.write('\nOK\n' if result.wasSuccessful() else '\nFAILED\n')
+    sys.exit(0 if result.wasSuccessful() else 1)
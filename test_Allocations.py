@@ -0,0 +1,90 @@
+###########################################################################################################################
+####################################################     LIBRARIES     ####################################################
+###########################################################################################################################
+
+# Set the cwd to the one of the file
+import os
+if __name__ == '__main__':
+    try: os.chdir(os.path.dirname(__file__))
+    except: pass
+
+import gc
+import unittest
+import tracemalloc
+from parameterized import parameterized_class
+
+import sys
+folders = ['./', '../', '../Modules']
+for folder in folders: sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), folder)))
+
+# Mock Qt modules to make them optional in the tests
+from unittest.mock import MagicMock
+sys.modules['PyQt5'] = MagicMock()
+sys.modules['PyQt5.QtGui'] = MagicMock()
+
+from Image_Processing import Image_Processing
+import Fixtures
+
+###########################################################################################################################
+#################################################     INITIALIZATIONS     #################################################
+###########################################################################################################################
+
+# Frames processed before measuring, so caches and lazy imports do not count as steady state allocations
+WARMUP_FRAMES = 100
+MEASURED_FRAMES = 2000
+# Memory a frame may leave behind once the capture loop is in steady state (bytes)
+RETAINED_BUDGET = 1024
+# Memory allocated and released within one frame (bytes). None until Image_Processing reuses preallocated buffers, the
+# measured value is reported in the skip reason meanwhile
+FRAME_BUDGET = None
+
+###########################################################################################################################
+
+def process_frames(frame, frames):
+    # Same work as the capture loop: a new captured buffer, its Image_Processing object and the resized image
+    for _ in range(frames):
+        image = Image_Processing(frame.copy())
+        image.resize_image()
+
+###########################################################################################################################
+
+@parameterized_class([
+    {'image_path': os.path.join(Fixtures.IMAGE_DIR, 'Home_Screen_1080p.png')},
+    {'image_path': os.path.join(Fixtures.IMAGE_DIR, 'Regice_Combat_720p.png')},
+])
+class Test_Allocations(unittest.TestCase):
+    def test_steady_state_allocations(self):
+        # Test that thousands of frames do not accumulate memory, and report what every frame allocates
+        frame = Fixtures.load_frame(self.image_path)
+        process_frames(frame, WARMUP_FRAMES)
+
+        gc.collect()
+        tracemalloc.start()
+        try:
+            start_memory, _ = tracemalloc.get_traced_memory()
+            frame_peaks = []
+            for _ in range(MEASURED_FRAMES):
+                tracemalloc.reset_peak()
+                before, _ = tracemalloc.get_traced_memory()
+                process_frames(frame, 1)
+                frame_peaks.append(tracemalloc.get_traced_memory()[1] - before)
+
+            gc.collect()
+            retained = (tracemalloc.get_traced_memory()[0] - start_memory) / MEASURED_FRAMES
+        finally: tracemalloc.stop()
+
+        frame_allocations = sum(frame_peaks) / len(frame_peaks)
+        self.assertLess(retained, RETAINED_BUDGET, f'Every frame leaves {retained:.0f} bytes behind')
+
+        if FRAME_BUDGET is None:
+            self.skipTest(f'No frame budget yet, every frame allocates {frame_allocations / 2 ** 20:.2f} MB')
+        self.assertLess(
+            frame_allocations, FRAME_BUDGET, f'Every frame allocates {frame_allocations / 2 ** 20:.2f} MB'
+        )
+
+###########################################################################################################################
+#####################################################     PROGRAM     #####################################################
+###########################################################################################################################
+
+if __name__ == '__main__':
+    unittest.main()
@@ -8,12 +8,13 @@ if __name__ == '__main__':
     try: os.chdir(os.path.dirname(__file__))
     except: pass
 
+import cv2
 import json
 import unittest
 from parameterized import parameterized_class
 
 import sys
-folders = ['../', '../Modules']
+folders = ['./', '../', '../Modules']
 for folder in folders: sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), folder)))
 
 # Mock Qt modules to make them optional in the tests
@@ -23,6 +24,7 @@ sys.modules['PyQt5.QtGui'] = MagicMock()
 
 from Image_Processing import Image_Processing
 import Control_System
+import Fixtures
 
 ###########################################################################################################################
 #################################################     INITIALIZATIONS     #################################################
@@ -38,6 +40,19 @@ with open(TESTS_DATA_FILE, 'r') as file:
 for item in TEST_DATA: 
     item['image_path'] = os.path.join(IMAGE_DIR, item['image_path'])
 
+# Field of the test data that holds the expected result of every detector
+DETECTOR_DATA_KEYS = {
+    'is_pairing_screen_visible': 'is_pairing_screen_visible',
+    'is_home_screen_visible': 'is_home_screen_visible',
+    'is_bdsp_loading_screen_visible': 'is_bdsp_load_white_screen_visible',
+    'is_black_screen_visible': 'is_load_black_screen_visible',
+    'is_white_screen_visible': 'is_load_white_screen_visible',
+    'is_overworld_text_box_visible': 'is_overworld_text_box_visible',
+    'is_combat_text_box_visible': 'is_combat_text_box_visible',
+    'is_life_box_visible': 'is_life_box_visible',
+    'is_double_combat_life_box_visible': 'is_double_combat_life_box_visible',
+}
+
 ###########################################################################################################################
 
 @parameterized_class(TEST_DATA)
@@ -46,8 +61,8 @@ class Test_Control_System(unittest.TestCase):
         # Ensure the file exists
         self.assertTrue(os.path.exists(self.image_path), f'File not found: {self.image_path}')
 
-        # Initialize the ImageProcessor object
-        self.image = Image_Processing(self.image_path)
+        # Initialize the ImageProcessor object from the shared decoded frame
+        self.image = Fixtures.get_image(Image_Processing, self.image_path)
         self.image.resize_image()
 
     #######################################################################################################################
@@ -123,10 +138,43 @@ class Test_Control_System(unittest.TestCase):
 
     #######################################################################################################################
 
+    @unittest.skipUnless(hasattr(Control_System, 'detect_all'), 'Control_System.detect_all is not available')
+    def test_detect_all(self):
+        # Test that the single-pass evaluation returns the same verdict as every individual detector
+        expected_results = {detector: getattr(self, data_key) for detector, data_key in DETECTOR_DATA_KEYS.items()}
+
+        results = Control_System.detect_all(self.image)
+        for detector, expected_result in expected_results.items():
+            self.assertEqual(expected_result, results[detector], f'detect_all mismatch for {detector}')
+            self.assertEqual(
+                getattr(Control_System, detector)(self.image), results[detector], f'{detector} differs from detect_all'
+            )
+
+    #######################################################################################################################
+
     def tearDown(self):
         # Clean up any resources if needed
         pass
 
+###########################################################################################################################
+
+class Test_Resolution_Independence(unittest.TestCase):
+    def test_720p_verdicts(self):
+        # Test that a 720p capture of every 1080p scene gets the same verdicts from every detector
+        for item in TEST_DATA:
+            frame = Fixtures.load_frame(item['image_path'])
+            if frame.shape[0] != 1080: continue
+
+            # Downscale as a 720p capture card would
+            image = Image_Processing(cv2.resize(frame, (1280, 720), interpolation = cv2.INTER_AREA))
+            image.resize_image()
+
+            for detector, data_key in DETECTOR_DATA_KEYS.items():
+                with self.subTest(scene = os.path.basename(item['image_path']), detector = detector):
+                    self.assertEqual(
+                        item[data_key], getattr(Control_System, detector)(image), f'{detector} differs at 720p'
+                    )
+
 ###########################################################################################################################
 #####################################################     PROGRAM     #####################################################
 ###########################################################################################################################
@@ -11,10 +11,12 @@ import PyQt5.QtGui as pyqt_g
 from PyQt5.QtWidgets import QApplication
 from parameterized import parameterized_class
 
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../')))
 
 from Modules.Image_Processing import Image_Processing
 import Constants as CONST
+import Fixtures
 
 ###########################################################################################################################
 #################################################     INITIALIZATIONS     #################################################
@@ -49,8 +51,8 @@ class Test_Image_Processing(unittest.TestCase):
         # Check that the test image file exists
         self.assertTrue(os.path.exists(self.image_path), f'File not found: {self.image_path}')
 
-        # Create the Image_Processing object with the image path
-        self.image = Image_Processing(self.image_path)
+        # Create the Image_Processing object from the shared decoded frame
+        self.image = Fixtures.get_image(Image_Processing, self.image_path)
 
         # Reset resized image to None before each test
         self.image.resized_image = None
@@ -68,11 +70,14 @@ class Test_Image_Processing(unittest.TestCase):
             - The image size matches the expected dimensions.
         """
 
+        # Load the image from its path, as the constructor would do outside of the tests
+        image = Image_Processing(self.image_path)
+
         # Ensure the image was loaded
-        self.assertIsNotNone(self.image.original_image, f'Failed to load image: {self.image_path}')
+        self.assertIsNotNone(image.original_image, f'Failed to load image: {self.image_path}')
 
         # Check the loaded image size
-        width, height = self.image.original_image.shape[1::-1]
+        width, height = image.original_image.shape[1::-1]
         self.assertEqual((width, height), tuple(self.image_original_size), f'Image size mismatch for {self.image_path}')
 
     #######################################################################################################################
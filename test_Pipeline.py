@@ -0,0 +1,104 @@
+###########################################################################################################################
+####################################################     LIBRARIES     ####################################################
+###########################################################################################################################
+
+# Set the cwd to the one of the file
+import os
+if __name__ == '__main__':
+    try: os.chdir(os.path.dirname(__file__))
+    except: pass
+
+import unittest
+from time import sleep
+
+import sys
+folders = ['./', '../', '../Modules']
+for folder in folders: sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), folder)))
+
+# Mock Qt modules to make them optional in the tests
+from unittest.mock import MagicMock
+sys.modules['PyQt5'] = MagicMock()
+sys.modules['PyQt5.QtGui'] = MagicMock()
+
+from Image_Processing import Image_Processing
+import Control_System
+import Fixtures
+import Pipeline
+import Replay
+
+###########################################################################################################################
+###########################################################################################################################
+
+class Test_Pipeline(unittest.TestCase):
+    def test_drop_oldest_queue(self):
+        # Test that a full queue discards its oldest item and keeps the most recent ones
+        queue = Pipeline.Drop_Oldest_Queue(2)
+        for item in range(5): queue.put(item)
+        queue.close()
+
+        self.assertEqual(queue.dropped, 3, 'Wrong number of dropped items')
+        self.assertEqual([queue.get(), queue.get(), queue.get()], [3, 4, None], 'Queue did not keep the newest items')
+
+    #######################################################################################################################
+
+    def test_wild_encounter_pipeline(self):
+        # Test that an unpaced source reaches the state machine frame by frame and walks a whole not shiny encounter
+        pipeline = Pipeline.Pipeline(Image_Processing, Control_System.search_wild_pokemon)
+        report = pipeline.run(Replay.synthetic_clip(Replay.WILD_ENCOUNTER_CLIP, hold_frames = 30), fps = 60)
+        counters = pipeline.counters()
+
+        expected_trace = [
+            'WAIT_HOME_SCREEN', 'MOVE_PLAYER', 'ENTER_COMBAT_1', 'ENTER_COMBAT_2', 'ENTER_COMBAT_3', 'CHECK_SHINY',
+            'ESCAPE_COMBAT_1', 'ESCAPE_COMBAT_2', 'ESCAPE_COMBAT_3', 'ESCAPE_COMBAT_4', 'ESCAPE_COMBAT_5', 'MOVE_PLAYER'
+        ]
+        self.assertEqual(counters['captured'], 30 * len(Replay.WILD_ENCOUNTER_CLIP), 'Not every frame was captured')
+        self.assertEqual(counters['processed'], counters['captured'], 'Frames were dropped without a live deadline')
+        self.assertEqual(pipeline.frame_indices, list(range(counters['captured'])), 'Frames were not processed in order')
+        self.assertEqual(report.state_trace, expected_trace, 'Unexpected state trace')
+        self.assertIn('state_machine', report.latency_summary(), 'Missing state machine latency')
+
+    #######################################################################################################################
+
+    def test_stage_errors_reach_caller(self):
+        # Test that an exception in the frame source or in a stage is raised by run() instead of hanging or being lost
+        def broken_source():
+            yield Fixtures.load_frame(os.path.join(Fixtures.IMAGE_DIR, 'Home_Screen_1080p.png')).copy()
+            raise FileNotFoundError('Could not open video')
+
+        def broken_state_machine(image, state):
+            raise ValueError('Broken state machine')
+
+        pipeline = Pipeline.Pipeline(Image_Processing, Control_System.search_wild_pokemon)
+        with self.assertRaises(FileNotFoundError): pipeline.run(broken_source())
+
+        for paced in [False, True]:
+            pipeline = Pipeline.Pipeline(Image_Processing, broken_state_machine)
+            clip = Replay.synthetic_clip(Replay.WILD_ENCOUNTER_CLIP, hold_frames = 5)
+            with self.assertRaises(ValueError): pipeline.run(clip, fps = 100, paced = paced)
+
+    #######################################################################################################################
+
+    def test_slow_stage_keeps_newest_frames(self):
+        # Test that a state machine slower than the capture rate works on the newest frames instead of falling behind
+        def slow_state_machine(image, state):
+            sleep(0.05)
+            return Control_System.search_wild_pokemon(image, state)
+
+        pipeline = Pipeline.Pipeline(Image_Processing, slow_state_machine, workers = 1)
+        pipeline.run(Replay.synthetic_clip(Replay.WILD_ENCOUNTER_CLIP, hold_frames = 5), fps = 100, paced = True)
+        counters = pipeline.counters()
+
+        self.assertGreater(counters['dropped_capture_queue'] + counters['dropped_control_queue'], 0, 'No frame dropped')
+        self.assertLess(counters['processed'], counters['captured'], 'The slow stage processed every frame')
+        self.assertEqual(pipeline.frame_indices[-1], counters['captured'] - 1, 'The newest frame was not processed')
+        self.assertTrue(
+            all(old < new for old, new in zip(pipeline.frame_indices, pipeline.frame_indices[1:])),
+            'Frames were not processed in capture order'
+        )
+
+###########################################################################################################################
+#####################################################     PROGRAM     #####################################################
+###########################################################################################################################
+
+if __name__ == '__main__':
+    unittest.main()
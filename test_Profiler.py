@@ -0,0 +1,124 @@
+###########################################################################################################################
+####################################################     LIBRARIES     ####################################################
+###########################################################################################################################
+
+# Set the cwd to the one of the file
+import os
+if __name__ == '__main__':
+    try: os.chdir(os.path.dirname(__file__))
+    except: pass
+
+import json
+import unittest
+import tempfile
+import threading
+
+import sys
+folders = ['./', '../', '../Modules']
+for folder in folders: sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), folder)))
+
+# Mock Qt modules to make them optional in the tests
+from unittest.mock import MagicMock
+sys.modules['PyQt5'] = MagicMock()
+sys.modules['PyQt5.QtGui'] = MagicMock()
+
+from Image_Processing import Image_Processing
+import Control_System
+import Fixtures
+import Profiler
+
+###########################################################################################################################
+#################################################     INITIALIZATIONS     #################################################
+###########################################################################################################################
+
+IMAGE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), 'Media/Images'))
+
+###########################################################################################################################
+###########################################################################################################################
+
+class Test_Profiler(unittest.TestCase):
+    def setUp(self):
+        self.profiler = Profiler.Profiler()
+        self.search_wild_pokemon = Control_System.search_wild_pokemon
+        self.resize_image = Image_Processing.resize_image
+
+    #######################################################################################################################
+
+    def test_profile_state_machine(self):
+        # Test that spans are tagged with the current state and transitions are counted
+        self.profiler.enable(Control_System, Image_Processing)
+
+        state = 'WAIT_PAIRING_SCREEN'
+        for image_name in ['Pairing_Screen_1080p.png', 'Home_Screen_1080p.png']:
+            image = Fixtures.get_image(Image_Processing, os.path.join(IMAGE_DIR, image_name))
+            image.resize_image()
+            state = Control_System.search_wild_pokemon(image, state)
+        self.profiler.disable()
+
+        histograms = self.profiler.histograms()
+        self.assertEqual(histograms['search_wild_pokemon']['calls'], 2, 'State machine calls not recorded')
+        self.assertEqual(histograms['resize_image']['calls'], 2, 'resize_image calls not recorded')
+        self.assertIn('WAIT_PAIRING_SCREEN', histograms['search_wild_pokemon']['by_state'], 'Span not tagged with state')
+        self.assertEqual(self.profiler.transitions[('WAIT_PAIRING_SCREEN', 'WAIT_HOME_SCREEN')], 1, 'Missing transition')
+        self.assertIn('WAIT_HOME_SCREEN', self.profiler.state_dwell, 'Missing state dwell time')
+
+        with tempfile.TemporaryDirectory() as directory:
+            trace_path = os.path.join(directory, 'trace.json')
+            self.profiler.export(trace_path)
+            with open(trace_path, 'r') as file: trace = json.load(file)
+        self.assertEqual(len(trace['traceEvents']), len(self.profiler.spans), 'Trace events do not match the spans')
+
+    #######################################################################################################################
+
+    def test_bounded_trace(self):
+        # Test that only the latest spans are kept for the trace while the aggregates still count every call
+        self.profiler = Profiler.Profiler(trace_spans = 3)
+        self.profiler.enable(Control_System, Image_Processing)
+
+        image = Fixtures.get_image(Image_Processing, os.path.join(IMAGE_DIR, 'Pairing_Screen_1080p.png'))
+        for _ in range(5): image.resize_image()
+        self.profiler.disable()
+
+        self.assertEqual(len(self.profiler.spans), 3, 'Trace is not bounded')
+        self.assertEqual(self.profiler.histograms()['resize_image']['calls'], 5, 'Dropped spans missing from the counts')
+
+    #######################################################################################################################
+
+    def test_off_thread_spans(self):
+        # Test that spans recorded outside the state machine thread are not tagged with its state
+        self.profiler.enable(Control_System, Image_Processing)
+
+        image = Fixtures.get_image(Image_Processing, os.path.join(IMAGE_DIR, 'Pairing_Screen_1080p.png'))
+        image.resize_image()
+        Control_System.search_wild_pokemon(image, 'WAIT_PAIRING_SCREEN') # WAIT_HOME_SCREEN
+        image.resize_image()
+        thread = threading.Thread(target = image.resize_image)
+        thread.start()
+        thread.join()
+        self.profiler.disable()
+
+        # Before the first state machine call and on the other thread there is no state
+        by_state = self.profiler.histograms()['resize_image']['by_state']
+        self.assertEqual(by_state, {'None': 2, 'WAIT_HOME_SCREEN': 1}, 'Off-thread span tagged with the state')
+
+    #######################################################################################################################
+
+    def test_disable_restores_functions(self):
+        # Test that a disabled profiler leaves the original functions in place
+        self.profiler.enable(Control_System, Image_Processing)
+        self.profiler.disable()
+
+        self.assertIs(Control_System.search_wild_pokemon, self.search_wild_pokemon, 'State machine not restored')
+        self.assertIs(Image_Processing.resize_image, self.resize_image, 'resize_image not restored')
+
+    #######################################################################################################################
+
+    def tearDown(self):
+        self.profiler.disable()
+
+###########################################################################################################################
+#####################################################     PROGRAM     #####################################################
+###########################################################################################################################
+
+if __name__ == '__main__':
+    unittest.main()
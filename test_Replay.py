@@ -0,0 +1,84 @@
+###########################################################################################################################
+####################################################     LIBRARIES     ####################################################
+###########################################################################################################################
+
+# Set the cwd to the one of the file
+import os
+if __name__ == '__main__':
+    try: os.chdir(os.path.dirname(__file__))
+    except: pass
+
+import unittest
+
+import sys
+folders = ['./', '../', '../Modules']
+for folder in folders: sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), folder)))
+
+# Mock Qt modules to make them optional in the tests
+from unittest.mock import MagicMock
+sys.modules['PyQt5'] = MagicMock()
+sys.modules['PyQt5.QtGui'] = MagicMock()
+
+from Image_Processing import Image_Processing
+import Control_System
+import Replay
+
+###########################################################################################################################
+###########################################################################################################################
+
+class Test_Replay(unittest.TestCase):
+    def test_synthetic_clip(self):
+        # Test that every image is held and blended into the next one
+        image_names = ['Black_Load_Screen_1080p.png', 'White_Load_Screen_1080p.png']
+        frames = list(Replay.synthetic_clip(image_names, hold_frames = 3, transition_frames = 2))
+
+        self.assertEqual(len(frames), 3 + 2 + 3, 'Unexpected number of frames in the synthetic clip')
+        self.assertLess(frames[0].mean(), frames[3].mean(), 'Transition does not fade towards the next image')
+        self.assertLess(frames[3].mean(), frames[-1].mean(), 'Transition does not fade towards the next image')
+
+        # An image can have its own hold
+        frames = list(Replay.synthetic_clip([image_names[0], (image_names[1], 5)], hold_frames = 3))
+        self.assertEqual(len(frames), 3 + 5, 'Image was not held for its own number of frames')
+
+    #######################################################################################################################
+
+    def test_replay_wild_encounter(self):
+        # Test that a synthetic clip at 60 FPS walks the wild state machine through a whole not shiny encounter
+        report = Replay.replay(
+            Replay.synthetic_clip(Replay.WILD_ENCOUNTER_CLIP, hold_frames = 30),
+            Image_Processing, Control_System.search_wild_pokemon, fps = 60
+        )
+
+        expected_trace = [
+            'WAIT_HOME_SCREEN', 'MOVE_PLAYER', 'ENTER_COMBAT_1', 'ENTER_COMBAT_2', 'ENTER_COMBAT_3', 'CHECK_SHINY',
+            'ESCAPE_COMBAT_1', 'ESCAPE_COMBAT_2', 'ESCAPE_COMBAT_3', 'ESCAPE_COMBAT_4', 'ESCAPE_COMBAT_5', 'MOVE_PLAYER'
+        ]
+        self.assertEqual(report.frames, 30 * len(Replay.WILD_ENCOUNTER_CLIP), 'Not every frame was replayed')
+        self.assertEqual(report.state_trace, expected_trace, 'Unexpected state trace')
+        self.assertGreater(report.fps(), 0, 'Frame rate was not measured')
+        self.assertEqual(set(report.latency_summary()), {'preprocess', 'state_machine'}, 'Missing stage latencies')
+
+    #######################################################################################################################
+
+    def test_replay_static_encounter(self):
+        # Test that a synthetic clip at 60 FPS walks the static state machine through a not shiny encounter and a restart
+        report = Replay.replay(
+            Replay.synthetic_clip(Replay.STATIC_ENCOUNTER_CLIP, hold_frames = 30),
+            Image_Processing, Control_System.static_encounter, fps = 60
+        )
+
+        expected_trace = [
+            'WAIT_HOME_SCREEN', 'ENTER_STATIC_COMBAT_1', 'ENTER_STATIC_COMBAT_2', 'ENTER_STATIC_COMBAT_3',
+            'ENTER_COMBAT_1', 'ENTER_COMBAT_2', 'ENTER_COMBAT_3', 'CHECK_SHINY', 'RESTART_GAME_1', 'RESTART_GAME_2',
+            'RESTART_GAME_3', 'RESTART_GAME_4', 'ENTER_STATIC_COMBAT_1'
+        ]
+        frames = sum(hold for _, hold in Replay.clip_holds(Replay.STATIC_ENCOUNTER_CLIP, 30))
+        self.assertEqual(report.frames, frames, 'Not every frame was replayed')
+        self.assertEqual(report.state_trace, expected_trace, 'Unexpected state trace')
+
+###########################################################################################################################
+#####################################################     PROGRAM     #####################################################
+###########################################################################################################################
+
+if __name__ == '__main__':
+    unittest.main()
@@ -13,7 +13,7 @@ from time import sleep
 from parameterized import parameterized_class
 
 import sys
-folders = ['../', '../Modules']
+folders = ['./', '../', '../Modules']
 for folder in folders: sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), folder)))
 
 # Mock Qt modules to make them optional in the tests
@@ -24,6 +24,8 @@ sys.modules['PyQt5.QtGui'] = MagicMock()
 from Image_Processing import Image_Processing
 import Constants as CONST
 import Control_System
+import Fixtures
+import Profiler
 
 ###########################################################################################################################
 #################################################     INITIALIZATIONS     #################################################
@@ -31,12 +33,40 @@ import Control_System
 
 IMAGE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), 'Media/Images'))
 
+# Every detector the state machines may call
+DETECTORS = [name for name in dir(Control_System) if name.startswith('is_') and name.endswith('_visible')]
+# Each state only needs the detectors of its own transitions, one or two of them
+MAX_DETECTORS_PER_FRAME = 2
+
+# Set PROFILE_TRACE to a file path to export a Chrome trace of every state machine test
+PROFILE_TRACE = os.environ.get('PROFILE_TRACE')
+
 ###########################################################################################################################
 
 @parameterized_class([{'state': 'WAIT_PAIRING_SCREEN'}])
 class Test_Image_Processing(unittest.TestCase):
     def setUp(self):
-        pass
+        # Record detector calls per state while the state machine runs
+        self.profiler = Profiler.Profiler()
+        self.profiler.enable(Control_System, Image_Processing)
+
+    #######################################################################################################################
+
+    def advance_time(self, seconds):
+        # Simulate that time has elapsed
+        Fixtures.advance_time(Control_System, seconds)
+
+    #######################################################################################################################
+
+    def check_detector_calls(self):
+        # Every state may only run the one or two detectors of its own transitions on each frame
+        histograms = self.profiler.histograms()
+        for state, frames in self.profiler.state_frames.items():
+            calls = sum(histograms[detector]['by_state'].get(state, 0) for detector in DETECTORS if detector in histograms)
+            self.assertLessEqual(
+                calls / frames, MAX_DETECTORS_PER_FRAME,
+                f'{state} runs {calls / frames:.1f} detectors per frame (at most {MAX_DETECTORS_PER_FRAME} expected)'
+            )
 
     #######################################################################################################################
 
@@ -57,7 +87,7 @@ class Test_Image_Processing(unittest.TestCase):
             if not hasattr(self, attribute_name):
                 image_path = os.path.join(IMAGE_DIR, image_name)
                 self.assertTrue(os.path.exists(image_path), f'File not found: {image_path}')
-                setattr(self, attribute_name, Image_Processing(image_path))
+                setattr(self, attribute_name, Fixtures.get_image(Image_Processing, image_path))
                 getattr(self, attribute_name).resize_image()
 
         # Open Game
@@ -68,7 +98,7 @@ class Test_Image_Processing(unittest.TestCase):
         # Not Shiny - Case 1 (Normal)
         self.state = Control_System.search_wild_pokemon(self.White_Load_Screen_1080p, self.state) # ENTER_COMBAT_1
         self.state = Control_System.search_wild_pokemon(self.Geodude_Combat_1080p, self.state) # ENTER_COMBAT_1
-        Control_System.state_timer -= 0.5 # Simulate time has elapsed
+        self.advance_time(0.5) # Simulate time has elapsed
         self.state = Control_System.search_wild_pokemon(self.Dialga_Animation_1080p, self.state) # ENTER_COMBAT_2
         self.state = Control_System.search_wild_pokemon(self.Geodude_Combat_1080p, self.state) # ENTER_COMBAT_3
         self.state = Control_System.search_wild_pokemon(self.Dialga_Animation_1080p, self.state) # CHECK_SHINY
@@ -81,7 +111,7 @@ class Test_Image_Processing(unittest.TestCase):
 
         # Not Shiny - Case 2 (Animation skipped due to resource overload)
         self.state = Control_System.search_wild_pokemon(self.White_Load_Screen_1080p, self.state) # ENTER_COMBAT_1
-        Control_System.state_timer -= 0.5 # Simulate time has elapsed
+        self.advance_time(0.5) # Simulate time has elapsed
         self.state = Control_System.search_wild_pokemon(self.Dialga_Animation_1080p, self.state) # ENTER_COMBAT_2
         self.state = Control_System.search_wild_pokemon(self.Geodude_Combat_1080p, self.state) # ENTER_COMBAT_3
         self.state = Control_System.search_wild_pokemon(self.Dialga_Animation_1080p, self.state) # CHECK_SHINY
@@ -97,14 +127,15 @@ class Test_Image_Processing(unittest.TestCase):
 
         # Shiny Found
         self.state = Control_System.search_wild_pokemon(self.White_Load_Screen_1080p, self.state) # ENTER_COMBAT_1
-        Control_System.state_timer -= 0.5 # Simulate time has elapsed
+        self.advance_time(0.5) # Simulate time has elapsed
         self.state = Control_System.search_wild_pokemon(self.Dialga_Animation_1080p, self.state) # ENTER_COMBAT_2
         self.state = Control_System.search_wild_pokemon(self.Geodude_Combat_1080p, self.state) # ENTER_COMBAT_3
         self.state = Control_System.search_wild_pokemon(self.Dialga_Animation_1080p, self.state) # CHECK_SHINY
-        Control_System.state_timer -= CONST.WILD_SHINY_DETECTION_TIME # Simulate time has elapsed
+        self.advance_time(CONST.WILD_SHINY_DETECTION_TIME) # Simulate time has elapsed
         self.state = Control_System.search_wild_pokemon(self.Geodude_Combat_1080p, self.state) # SHINY_FOUND
 
         self.assertEqual(self.state, "SHINY_FOUND", 'Failed to find shiny in wild encounters')
+        self.check_detector_calls()
 
     #######################################################################################################################
 
@@ -126,7 +157,7 @@ class Test_Image_Processing(unittest.TestCase):
             if not hasattr(self, attribute_name):
                 image_path = os.path.join(IMAGE_DIR, image_name)
                 self.assertTrue(os.path.exists(image_path), f'File not found: {image_path}')
-                setattr(self, attribute_name, Image_Processing(image_path))
+                setattr(self, attribute_name, Fixtures.get_image(Image_Processing, image_path))
                 getattr(self, attribute_name).resize_image()
 
         # Open Game
@@ -138,10 +169,10 @@ class Test_Image_Processing(unittest.TestCase):
         self.state = Control_System.static_encounter(self.Overworld_Text_Box_1080p, self.state) # ENTER_STATIC_COMBAT_2
         self.state = Control_System.static_encounter(self.Dialga_Animation_1080p, self.state) # ENTER_STATIC_COMBAT_3
         self.state = Control_System.static_encounter(self.White_Load_Screen_1080p, self.state) # ENTER_STATIC_COMBAT_3
-        Control_System.state_timer -= CONST.STATIC_ENCOUNTERS_DELAY # Simulate time has elapsed
+        self.advance_time(CONST.STATIC_ENCOUNTERS_DELAY) # Simulate time has elapsed
         self.state = Control_System.static_encounter(self.White_Load_Screen_1080p, self.state) # ENTER_STATIC_COMBAT_3
         self.state = Control_System.static_encounter(self.White_Load_Screen_1080p, self.state) # ENTER_COMBAT_1
-        Control_System.state_timer -= 0.5 # Simulate time has elapsed
+        self.advance_time(0.5) # Simulate time has elapsed
         self.state = Control_System.static_encounter(self.Dialga_Animation_1080p, self.state) # ENTER_COMBAT_2
         self.state = Control_System.static_encounter(self.Geodude_Combat_1080p, self.state) # ENTER_COMBAT_3
         self.state = Control_System.static_encounter(self.Dialga_Animation_1080p, self.state) # CHECK_SHINY
@@ -156,17 +187,24 @@ class Test_Image_Processing(unittest.TestCase):
         # Shiny Found
         self.state = Control_System.static_encounter(self.Overworld_Text_Box_1080p, self.state) # ENTER_STATIC_COMBAT_2
         self.state = Control_System.static_encounter(self.Dialga_Animation_1080p, self.state) # ENTER_STATIC_COMBAT_3
-        Control_System.state_timer -= CONST.STATIC_ENCOUNTERS_DELAY # Simulate time has elapsed
+        self.advance_time(CONST.STATIC_ENCOUNTERS_DELAY) # Simulate time has elapsed
         self.state = Control_System.static_encounter(self.White_Load_Screen_1080p, self.state) # ENTER_STATIC_COMBAT_3
         self.state = Control_System.static_encounter(self.White_Load_Screen_1080p, self.state) # ENTER_COMBAT_1
-        Control_System.state_timer -= 0.5 # Simulate time has elapsed
+        self.advance_time(0.5) # Simulate time has elapsed
         self.state = Control_System.static_encounter(self.Dialga_Animation_1080p, self.state) # ENTER_COMBAT_2
         self.state = Control_System.static_encounter(self.Geodude_Combat_1080p, self.state) # ENTER_COMBAT_3
         self.state = Control_System.static_encounter(self.Dialga_Animation_1080p, self.state) # CHECK_SHINY
-        Control_System.state_timer -= 50 # Simulate time has elapsed
+        self.advance_time(50) # Simulate time has elapsed
         self.state = Control_System.static_encounter(self.Geodude_Combat_1080p, self.state) # SHINY_FOUND
         
         self.assertEqual(self.state, "SHINY_FOUND", 'Failed to find shiny in wild encounters')
+        self.check_detector_calls()
+
+    #######################################################################################################################
+
+    def tearDown(self):
+        self.profiler.disable()
+        if PROFILE_TRACE: self.profiler.export(f'{os.path.splitext(PROFILE_TRACE)[0]}_{self._testMethodName}.json')
 
 ###########################################################################################################################
 #####################################################     PROGRAM     #####################################################